@@ -1,6 +0,0 @@
-"""Databricks assistant agent - imports from the modular package."""
-
-# Re-export the main function from the package
-from .databricks_assistant.agent import databricks_agent
-
-__all__ = ['databricks_agent']
@@ -1,5 +1,5 @@
 """Databricks assistant agent package."""
 
-from .agent import databricks_agent
+from .agent import databricks_agent, databricks_agent_stream
 
-__all__ = ['databricks_agent']
+__all__ = ['databricks_agent', 'databricks_agent_stream']
@@ -1,32 +1,86 @@
 """LangChain agent with Databricks catalog exploration tools."""
 
+import asyncio
+import functools
 import logging
-from typing import Any, Dict, List
+import os
+import re
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
 import mlflow
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_community.cache import RedisCache, SQLiteCache
 from langchain_community.chat_models import ChatDatabricks
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from mlflow.exceptions import MlflowException
 from openai.types.chat import ChatCompletionMessageParam
+from requests import HTTPError
 
 from .tools import create_catalog_tools
 
 logger = logging.getLogger(__name__)
 
-# Agent prompt
-SYSTEM_PROMPT = """You are a helpful Databricks assistant that can explore Unity Catalog.
+# Cache LLM responses so repeated prompts skip the model round-trip. Set CACHE_ENABLED=false
+# to disable, and REDIS_URL to share the cache across workers instead of a local SQLite file.
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_PATH = '.langchain_cache.db'
 
-You have access to tools that let you:
-- List all catalogs in the workspace
-- List schemas within a specific catalog
-- List tables within a specific schema
-- List volumes within a specific schema
+# Agent prompt. Kept short because it is resent on every agent step.
+SYSTEM_PROMPT = 'You are a Databricks Unity Catalog explorer. Use the tools to answer.'
 
-Use these tools to help users understand their data structure and find the information they need.
-When listing items, present them in a clear, organized format.
+# Longer guidance, only sent back to the model when it emits a malformed response.
+FORMAT_ERROR_GUIDANCE = """Your last response could not be parsed. Use the tools to explore
+catalogs, schemas, tables, and volumes, starting from the catalog structure when unsure, and
+present listings in a clear, organized format."""
 
-Always be helpful and provide context about what you find. If a user asks about data,
-start by exploring the catalog structure to understand what's available."""
+NO_USER_MESSAGE_REPLY = 'Please provide a question or request.'
+
+# Tool results are truncated in streamed progress events.
+TOOL_OUTPUT_PREVIEW_CHARS = 200
+
+# Simple listing questions are routed to FAST_ENDPOINT. Everything else goes to
+# PRIMARY_ENDPOINT, which falls back to FAST_ENDPOINT when the endpoint call fails or times out.
+PRIMARY_ENDPOINT = os.getenv('PRIMARY_ENDPOINT', 'databricks-claude-sonnet-4')
+FAST_ENDPOINT = os.getenv('FAST_ENDPOINT', 'databricks-llama-4-maverick')
+SIMPLE_QUERY_PATTERN = re.compile(
+  r'^\s*(list|show|what (catalogs|schemas|tables|volumes))\b', re.IGNORECASE
+)
+
+# Each PRIMARY_ENDPOINT planning step gets this long before falling back. It must stay well
+# under the executor's max_execution_time, since the endpoint's own request timeout and retries
+# would otherwise outlast the whole run.
+PRIMARY_TIMEOUT_SECONDS = float(os.getenv('PRIMARY_TIMEOUT_SECONDS', 8))
+
+# Agent executors are built once per endpoint and mode (streaming or not) and reused across
+# requests.
+_EXECUTORS: Dict[Tuple[str, bool], AgentExecutor] = {}
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _configure_llm_cache() -> None:
+  """Install the global LangChain LLM cache."""
+  if not CACHE_ENABLED:
+    return
+
+  redis_url = os.getenv('REDIS_URL')
+  if redis_url:
+    try:
+      import redis
+    except ImportError:
+      logger.warning('REDIS_URL is set but redis is not installed; using the local SQLite cache.')
+    else:
+      set_llm_cache(RedisCache(redis.Redis.from_url(redis_url)))
+      return
+
+  set_llm_cache(SQLiteCache(database_path=LLM_CACHE_PATH))
+
+
+_configure_llm_cache()
 
 
 def format_messages_for_langchain(
@@ -50,60 +104,139 @@ def format_messages_for_langchain(
   return formatted_messages
 
 
-@mlflow.trace(span_type='LLM')
-def databricks_agent(messages: List[ChatCompletionMessageParam]) -> Dict[str, Any]:
-  """A LangChain agent that can explore Databricks catalogs and answer questions."""
-  # Initialize the LLM
-  llm = ChatDatabricks(
-    endpoint='databricks-claude-sonnet-4',
+@functools.lru_cache(maxsize=None)
+def _get_llm(endpoint: str) -> ChatDatabricks:
+  """Get the shared chat model for a serving endpoint."""
+  return ChatDatabricks(
+    endpoint=endpoint,
     max_tokens=1000,
     temperature=0.1,
   )
 
-  # Create the prompt template
-  prompt = ChatPromptTemplate.from_messages(
+
+def _build_prompt(system_message: SystemMessage) -> ChatPromptTemplate:
+  """Build the agent prompt template around a system message."""
+  return ChatPromptTemplate.from_messages(
     [
-      ('system', SYSTEM_PROMPT),
+      system_message,
       MessagesPlaceholder(variable_name='messages'),
       MessagesPlaceholder(variable_name='agent_scratchpad'),
     ]
   )
 
-  # Create tools
-  tools = create_catalog_tools()
 
-  # Create the agent
-  agent = create_tool_calling_agent(
-    llm=llm,
-    tools=tools,
-    prompt=prompt,
+# Prompt templates are compiled once at import; per-request messages are fed in via invoke.
+# Claude endpoints get the system block marked for provider prompt caching. Anthropic caches
+# tools and system prompt as one prefix, so the marker covers the tool schemas too. The user
+# turn is never marked since it changes every call. Anthropic only caches prefixes of at least
+# 1024 tokens, and the prompt plus tool schemas is currently about 600, so the marker has no
+# effect until the prefix grows past that.
+_PROMPT = _build_prompt(SystemMessage(content=SYSTEM_PROMPT))
+_CACHED_PROMPT = _build_prompt(
+  SystemMessage(
+    content=[{'type': 'text', 'text': SYSTEM_PROMPT, 'cache_control': {'type': 'ephemeral'}}]
   )
+)
+
+# The catalog tools are stateless, so every executor shares one set.
+_TOOLS = create_catalog_tools()
+
+
+def _build_agent(endpoint: str) -> Runnable:
+  """Build the tool-calling agent for an endpoint, with the prompt suited to its model."""
+  return create_tool_calling_agent(
+    llm=_get_llm(endpoint),
+    tools=_TOOLS,
+    prompt=_CACHED_PROMPT if 'claude' in endpoint else _PROMPT,
+  )
+
+
+def _with_deadline(agent: Runnable, timeout: float) -> Runnable:
+  """Wrap an agent so a planning step slower than timeout seconds raises TimeoutError.
+
+  The agent is only run asynchronously, so the wrapper has no sync path.
+  """
+
+  # AgentExecutor checks this exact return annotation (with the builtin list) to treat the
+  # wrapper as a multi-action agent.
+  async def plan(
+    inputs: Dict[str, Any], config: RunnableConfig
+  ) -> Union[list[AgentAction], AgentFinish]:
+    return await asyncio.wait_for(agent.ainvoke(inputs, config), timeout=timeout)
+
+  return RunnableLambda(plan, name='primary_agent')
+
+
+def _build_executor(endpoint: str, streaming: bool) -> AgentExecutor:
+  """Build the LLM and agent executor for an endpoint.
+
+  Only the non-streaming executor reads the LLM cache: LangChain skips the cache when the model
+  is streamed, so it calls the model with invoke rather than stream.
+  """
+  # Fall back at the agent level so the fallback model gets its own prompt.
+  # The serving client raises MlflowException for most failures, and requests' HTTPError for 5xx
+  # and 429 responses.
+  agent = _build_agent(endpoint)
+  if endpoint != FAST_ENDPOINT:
+    agent = _with_deadline(agent, PRIMARY_TIMEOUT_SECONDS).with_fallbacks(
+      [_build_agent(FAST_ENDPOINT)],
+      exceptions_to_handle=(TimeoutError, MlflowException, HTTPError),
+    )
 
   # Create the agent executor
-  agent_executor = AgentExecutor(
+  return AgentExecutor(
     agent=agent,
-    tools=tools,
+    tools=_TOOLS,
     verbose=True,
-    handle_parsing_errors=True,
+    handle_parsing_errors=FORMAT_ERROR_GUIDANCE,
+    # Bound the tool-calling loop so one slow turn can't hold a request indefinitely.
+    max_iterations=5,
+    max_execution_time=20,
+    early_stopping_method='force',
+    stream_runnable=streaming,
   )
 
+
+def _get_executor(endpoint: str, streaming: bool = False) -> AgentExecutor:
+  """Get the shared agent executor for an endpoint, building it on first use."""
+  key = (endpoint, streaming)
+  executor = _EXECUTORS.get(key)
+  if executor is None:
+    with _EXECUTOR_LOCK:
+      executor = _EXECUTORS.get(key)
+      if executor is None:
+        executor = _EXECUTORS[key] = _build_executor(endpoint, streaming)
+  return executor
+
+
+def _route(query: Any) -> str:
+  """Pick the serving endpoint for a user query."""
+  if isinstance(query, str) and SIMPLE_QUERY_PATTERN.match(query):
+    return FAST_ENDPOINT
+  return PRIMARY_ENDPOINT
+
+
+def _last_user_message(messages: List[ChatCompletionMessageParam]) -> Optional[str]:
+  """Get the content of the last user message, or None if there is none."""
+  return next(
+    (msg.get('content', '') for msg in reversed(messages) if msg.get('role') == 'user'), None
+  )
+
+
+@mlflow.trace(span_type='LLM')
+async def databricks_agent(messages: List[ChatCompletionMessageParam]) -> Dict[str, Any]:
+  """A LangChain agent that can explore Databricks catalogs and answer questions."""
   # Format messages for LangChain
   formatted_messages = format_messages_for_langchain(messages)
 
   # Get the last user message as the input
-  user_messages = [msg for msg in messages if msg.get('role') == 'user']
-  if not user_messages:
-    return {
-      'choices': [
-        {'message': {'role': 'assistant', 'content': 'Please provide a question or request.'}}
-      ]
-    }
-
-  last_user_message = user_messages[-1].get('content', '')
+  last_user_message = _last_user_message(messages)
+  if last_user_message is None:
+    return {'choices': [{'message': {'role': 'assistant', 'content': NO_USER_MESSAGE_REPLY}}]}
 
   # Run the agent
   try:
-    result = agent_executor.invoke(
+    result = await _get_executor(_route(last_user_message)).ainvoke(
       {
         'messages': formatted_messages,
         'input': last_user_message,
@@ -128,3 +261,41 @@ def databricks_agent(messages: List[ChatCompletionMessageParam]) -> Dict[str, An
         {'message': {'role': 'assistant', 'content': f'I encountered an error: {str(e)}'}}
       ]
     }
+
+
+@mlflow.trace(span_type='LLM')
+async def databricks_agent_stream(
+  messages: List[ChatCompletionMessageParam],
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+  """Stream agent progress as `(event, data)` pairs.
+
+  Emits `tool_start` / `tool_end` as tools run and `token` for each text delta, so
+  clients can show activity before the final answer starts generating.
+  """
+  last_user_message = _last_user_message(messages)
+  if last_user_message is None:
+    yield 'token', {'delta': NO_USER_MESSAGE_REPLY}
+    return
+
+  try:
+    async for event in _get_executor(_route(last_user_message), streaming=True).astream_events(
+      {
+        'messages': format_messages_for_langchain(messages),
+        'input': last_user_message,
+      },
+      version='v2',
+    ):
+      kind = event['event']
+      if kind == 'on_chat_model_stream':
+        content = event['data']['chunk'].content
+        if content and isinstance(content, str):
+          yield 'token', {'delta': content}
+      elif kind == 'on_tool_start':
+        yield 'tool_start', {'name': event['name'], 'input': event['data'].get('input')}
+      elif kind == 'on_tool_end':
+        output = event['data'].get('output')
+        output = getattr(output, 'content', output)
+        yield 'tool_end', {'name': event['name'], 'output': str(output)[:TOOL_OUTPUT_PREVIEW_CHARS]}
+  except Exception as e:
+    logger.error(f'Error in agent execution: {str(e)}')
+    yield 'error', {'message': f'I encountered an error: {str(e)}'}
@@ -1,38 +1,59 @@
 """Authentication utilities for Databricks SDK."""
 
+import functools
 import os
+from typing import Optional
 
 from databricks.sdk import WorkspaceClient
-from dotenv import load_dotenv
 
-load_dotenv(dotenv_path='.env.local')
+# Credentials are read from the environment once at import. Call reload_auth() after
+# changing them at runtime.
+_HOST: str = ''
+_TOKEN: Optional[str] = None
+_CLIENT_ID: Optional[str] = None
+_CLIENT_SECRET: Optional[str] = None
 
 
+def _read_auth_env() -> None:
+  """Snapshot the Databricks credentials from the environment."""
+  global _HOST, _TOKEN, _CLIENT_ID, _CLIENT_SECRET
+  _HOST = os.getenv('DATABRICKS_HOST', '')
+  # Remove https:// prefix if present
+  if _HOST.startswith('https://'):
+    _HOST = _HOST[8:]
+  _TOKEN = os.getenv('DATABRICKS_TOKEN')
+  _CLIENT_ID = os.getenv('DATABRICKS_CLIENT_ID')
+  _CLIENT_SECRET = os.getenv('DATABRICKS_CLIENT_SECRET')
+
+
+_read_auth_env()
+
+
+def reload_auth() -> None:
+  """Re-read credentials from the environment and drop the cached WorkspaceClient."""
+  _read_auth_env()
+  get_workspace_client.cache_clear()
+
+
+@functools.lru_cache(maxsize=1)
 def get_workspace_client() -> WorkspaceClient:
   """Initialize Databricks WorkspaceClient with proper authentication.
 
   Supports both development (token-based) and production (OAuth) authentication.
   In production Databricks Apps, uses DATABRICKS_CLIENT_ID and DATABRICKS_CLIENT_SECRET.
   In development, uses DATABRICKS_HOST and DATABRICKS_TOKEN.
-  """
-  # Check for OAuth client credentials (production in Databricks Apps)
-  client_id = os.getenv('DATABRICKS_CLIENT_ID')
-  client_secret = os.getenv('DATABRICKS_CLIENT_SECRET')
 
-  if client_id and client_secret:
+  The client is created once per process and shared across tool invocations so the
+  SDK auth chain (OAuth token exchange in production) is not repeated on every call.
+  """
+  if _CLIENT_ID and _CLIENT_SECRET:
     # Production: Use OAuth client credentials
     # Let the SDK handle the authentication automatically
     return WorkspaceClient()
 
-  # Development: Use token-based authentication
-  databricks_host = os.getenv('DATABRICKS_HOST')
-  databricks_token = os.getenv('DATABRICKS_TOKEN')
-
-  if databricks_token and databricks_host:
-    # Remove https:// prefix if present
-    if databricks_host.startswith('https://'):
-      databricks_host = databricks_host[8:]
-    return WorkspaceClient(host=databricks_host, token=databricks_token)
+  if _TOKEN and _HOST:
+    # Development: Use token-based authentication
+    return WorkspaceClient(host=_HOST, token=_TOKEN)
 
   # Fallback: Let the SDK try to authenticate using its default chain
   # This works in Databricks Apps with proper environment setup
@@ -1,121 +1,292 @@
 """Databricks catalog exploration tools for LangChain agent."""
 
+import asyncio
+import functools
+import itertools
 import logging
-from typing import List
+import os
+import threading
+from typing import Any, Awaitable, Callable, Iterable, List, Tuple
 
-from langchain.tools import StructuredTool, Tool
-from pydantic import BaseModel, Field
+import cachetools
+from langchain.tools import StructuredTool
+from pydantic import BaseModel, Field, ValidationError
 
 from .auth import get_workspace_client
 
 logger = logging.getLogger(__name__)
 
+# Catalog structure changes slowly, so listings are reused for this many seconds.
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', 300))
 
-class SchemaInput(BaseModel):
+# Tool calls that take longer than this return a timeout message instead of stalling the agent.
+TOOL_TIMEOUT_SECONDS = float(os.getenv('TOOL_TIMEOUT_SECONDS', 5))
+
+# Upper bound on concurrent SDK calls made by a single bulk tool call.
+BULK_LIST_CONCURRENCY = 8
+
+# Listings stop after this many items so large workspaces don't page through everything.
+DEFAULT_MAX_RESULTS = 200
+
+
+class ListingOptions(BaseModel):
+  """Options shared by the listing tools."""
+
+  max_results: int = Field(default=DEFAULT_MAX_RESULTS, ge=1, description='Max items to return')
+  name_prefix: str = Field(default='', description='Only names starting with this')
+
+
+class SchemaInput(ListingOptions):
   """Input for listing schemas."""
 
-  catalog_name: str = Field(description='Name of the catalog to list schemas from')
+  catalog_name: str = Field(description='Catalog name')
 
 
-class TableInput(BaseModel):
+class TableInput(ListingOptions):
   """Input for listing tables."""
 
-  catalog_name: str = Field(description='Name of the catalog')
-  schema_name: str = Field(description='Name of the schema')
+  catalog_name: str = Field(description='Catalog name')
+  schema_name: str = Field(description='Schema name')
+
+
+class BulkTableInput(BaseModel):
+  """Input for listing tables across several schemas."""
 
+  catalog_name: str = Field(description='Catalog name')
+  schema_names: List[str] = Field(description='Schema names')
 
-class VolumeInput(BaseModel):
+
+class VolumeInput(ListingOptions):
   """Input for listing volumes."""
 
-  catalog_name: str = Field(description='Name of the catalog')
-  schema_name: str = Field(description='Name of the schema')
+  catalog_name: str = Field(description='Catalog name')
+  schema_name: str = Field(description='Schema name')
+
+
+def _run_in_thread(
+  func: Callable[..., str], retry_hint: str = 'retry with a narrower name_prefix'
+) -> Callable[..., Awaitable[str]]:
+  """Wrap a blocking tool function so the agent can await it off the event loop.
+
+  Calls are bounded by TOOL_TIMEOUT_SECONDS. The worker thread keeps running after a timeout,
+  so a slow listing still lands in the TTL cache for the next call. retry_hint tells the LLM
+  how to narrow the call, in terms of the arguments of the tool it actually invoked.
+  """
+
+  @functools.wraps(func)
+  async def wrapper(*args, **kwargs) -> str:
+    try:
+      return await asyncio.wait_for(
+        asyncio.to_thread(func, *args, **kwargs), timeout=TOOL_TIMEOUT_SECONDS
+      )
+    except asyncio.TimeoutError:
+      logger.warning(f'{func.__name__} timed out after {TOOL_TIMEOUT_SECONDS}s')
+      return (
+        f'{func.__name__} timed out after {TOOL_TIMEOUT_SECONDS}s, so no results are available. '
+        f'Answer with what you have, or {retry_hint}.'
+      )
+
+  return wrapper
+
+
+def _invalid_arguments(error: ValidationError) -> str:
+  """Report invalid tool arguments back to the LLM so it can correct them."""
+  return f'Invalid arguments: {error}'
+
+
+def _ttl_cached(func: Callable) -> Callable:
+  """Cache a listing per arguments for CATALOG_CACHE_TTL seconds.
+
+  Exceptions are not cached, so a failed lookup is retried on the next call.
+  """
+  cache = cachetools.TTLCache(maxsize=1024, ttl=CATALOG_CACHE_TTL)
+  return cachetools.cached(cache, lock=threading.Lock())(func)
+
+
+def _take(items: Iterable[Any], max_results: int, name_prefix: str) -> Tuple[List[Any], bool]:
+  """Take up to max_results named items matching name_prefix, and whether more matched.
 
+  Stops iterating once one item past the cap is seen, so the SDK fetches no further pages.
+  """
+  matching = (item for item in items if item.name and item.name.startswith(name_prefix))
+  taken = list(itertools.islice(matching, max_results + 1))
+  return taken[:max_results], len(taken) > max_results
 
-def list_catalogs(query: str = '') -> str:
-  """List all available catalogs in the workspace."""
+
+def _more_marker(truncated: bool, max_results: int) -> str:
+  """Suffix telling the LLM a listing was cut off."""
+  if not truncated:
+    return ''
+  return f' … more than {max_results}; narrow with name_prefix or raise max_results.'
+
+
+@_ttl_cached
+def _catalog_names(max_results: int, name_prefix: str) -> Tuple[List[str], bool]:
+  """Names of catalogs in the workspace, and whether the listing was truncated."""
+  w = get_workspace_client()
+  catalogs, truncated = _take(w.catalogs.list(), max_results, name_prefix)
+  return [cat.name for cat in catalogs], truncated
+
+
+@_ttl_cached
+def _schema_names(catalog_name: str, max_results: int, name_prefix: str) -> Tuple[List[str], bool]:
+  """Names of schemas in a catalog, and whether the listing was truncated."""
+  w = get_workspace_client()
+  schemas, truncated = _take(w.schemas.list(catalog_name=catalog_name), max_results, name_prefix)
+  return [schema.name for schema in schemas], truncated
+
+
+@_ttl_cached
+def _table_infos(
+  catalog_name: str, schema_name: str, max_results: int, name_prefix: str
+) -> Tuple[List[Tuple[str, str]], bool]:
+  """`(name, table_type)` pairs for tables in a schema, and whether the listing was truncated."""
+  w = get_workspace_client()
+  tables = w.tables.list(
+    catalog_name=catalog_name, schema_name=schema_name, omit_columns=True, omit_properties=True
+  )
+  tables, truncated = _take(tables, max_results, name_prefix)
+  table_infos = [(table.name, getattr(table, 'table_type', 'TABLE') or 'TABLE') for table in tables]
+  return table_infos, truncated
+
+
+@_ttl_cached
+def _volume_names(
+  catalog_name: str, schema_name: str, max_results: int, name_prefix: str
+) -> Tuple[List[str], bool]:
+  """Names of volumes in a schema, and whether the listing was truncated."""
+  w = get_workspace_client()
+  volumes = w.volumes.list(catalog_name=catalog_name, schema_name=schema_name)
+  volumes, truncated = _take(volumes, max_results, name_prefix)
+  return [vol.name for vol in volumes], truncated
+
+
+def list_catalogs(max_results: int = DEFAULT_MAX_RESULTS, name_prefix: str = '') -> str:
+  """List available catalogs in the workspace."""
   try:
-    w = get_workspace_client()
-    catalogs = w.catalogs.list()
-    catalog_names = [cat.name for cat in catalogs if cat.name]
+    catalog_names, truncated = _catalog_names(max_results, name_prefix)
     if catalog_names:
-      return f'Available catalogs: {", ".join(catalog_names)}'
+      return f'Available catalogs: {", ".join(catalog_names)}{_more_marker(truncated, max_results)}'
     else:
       return 'No catalogs found in the workspace.'
   except Exception as e:
     return f'Error listing catalogs: {str(e)}'
 
 
-def list_schemas(catalog_name: str) -> str:
-  """List all schemas in a specific catalog."""
+def list_schemas(
+  catalog_name: str, max_results: int = DEFAULT_MAX_RESULTS, name_prefix: str = ''
+) -> str:
+  """List schemas in a specific catalog."""
   try:
-    w = get_workspace_client()
-    schemas = w.schemas.list(catalog_name=catalog_name)
-    schema_names = [schema.name for schema in schemas if schema.name]
+    schema_names, truncated = _schema_names(catalog_name, max_results, name_prefix)
     if schema_names:
-      return f'Schemas in catalog "{catalog_name}": {", ".join(schema_names)}'
+      return (
+        f'Schemas in catalog "{catalog_name}": {", ".join(schema_names)}'
+        f'{_more_marker(truncated, max_results)}'
+      )
     else:
       return f'No schemas found in catalog "{catalog_name}".'
   except Exception as e:
     return f'Error listing schemas in catalog "{catalog_name}": {str(e)}'
 
 
-def list_tables(catalog_name: str, schema_name: str) -> str:
-  """List all tables in a specific schema."""
+def list_tables(
+  catalog_name: str,
+  schema_name: str,
+  max_results: int = DEFAULT_MAX_RESULTS,
+  name_prefix: str = '',
+) -> str:
+  """List tables in a specific schema."""
   try:
-    w = get_workspace_client()
-    tables = w.tables.list(catalog_name=catalog_name, schema_name=schema_name)
-    table_info = []
-    for table in tables:
-      if table.name:
-        table_type = getattr(table, 'table_type', 'TABLE')
-        table_info.append(f'{table.name} ({table_type})')
-
-    if table_info:
-      return f'Tables in {catalog_name}.{schema_name}: {", ".join(table_info)}'
+    table_infos, truncated = _table_infos(catalog_name, schema_name, max_results, name_prefix)
+    if table_infos:
+      table_info = ', '.join(f'{name} ({table_type})' for name, table_type in table_infos)
+      return (
+        f'Tables in {catalog_name}.{schema_name}: {table_info}'
+        f'{_more_marker(truncated, max_results)}'
+      )
     else:
       return f'No tables found in {catalog_name}.{schema_name}.'
   except Exception as e:
     return f'Error listing tables in {catalog_name}.{schema_name}: {str(e)}'
 
 
-def list_volumes(catalog_name: str, schema_name: str) -> str:
-  """List all volumes in a specific schema."""
+async def list_tables_bulk(catalog_name: str, schema_names: List[str]) -> str:
+  """List the tables in several schemas of a catalog concurrently."""
+  if not schema_names:
+    return f'No schemas given for catalog "{catalog_name}".'
+
+  semaphore = asyncio.Semaphore(BULK_LIST_CONCURRENCY)
+  list_tables_async = _run_in_thread(list_tables, retry_hint='retry with fewer schema_names')
+
+  async def list_one(schema_name: str) -> str:
+    async with semaphore:
+      return await list_tables_async(catalog_name, schema_name)
+
+  results = await asyncio.gather(*(list_one(schema_name) for schema_name in schema_names))
+  return '\n'.join(results)
+
+
+def list_volumes(
+  catalog_name: str,
+  schema_name: str,
+  max_results: int = DEFAULT_MAX_RESULTS,
+  name_prefix: str = '',
+) -> str:
+  """List volumes in a specific schema."""
   try:
-    w = get_workspace_client()
-    volumes = w.volumes.list(catalog_name=catalog_name, schema_name=schema_name)
-    volume_names = [vol.name for vol in volumes if vol.name]
+    volume_names, truncated = _volume_names(catalog_name, schema_name, max_results, name_prefix)
     if volume_names:
-      return f'Volumes in {catalog_name}.{schema_name}: {", ".join(volume_names)}'
+      return (
+        f'Volumes in {catalog_name}.{schema_name}: {", ".join(volume_names)}'
+        f'{_more_marker(truncated, max_results)}'
+      )
     else:
       return f'No volumes found in {catalog_name}.{schema_name}.'
   except Exception as e:
     return f'Error listing volumes in {catalog_name}.{schema_name}: {str(e)}'
 
 
-def create_catalog_tools() -> List[Tool]:
+def create_catalog_tools() -> List[StructuredTool]:
   """Create and return the list of catalog exploration tools."""
   return [
-    Tool(
-      name='list_catalogs',
+    StructuredTool.from_function(
       func=list_catalogs,
-      description='List all available catalogs in the Databricks workspace.',
+      coroutine=_run_in_thread(list_catalogs),
+      name='list_catalogs',
+      description='List catalogs in the workspace.',
+      args_schema=ListingOptions,
+      handle_validation_error=_invalid_arguments,
     ),
     StructuredTool.from_function(
       func=list_schemas,
+      coroutine=_run_in_thread(list_schemas),
       name='list_schemas',
-      description='List all schemas in a specific catalog. Requires the catalog name as input.',
+      description='List schemas in a catalog.',
       args_schema=SchemaInput,
+      handle_validation_error=_invalid_arguments,
     ),
     StructuredTool.from_function(
       func=list_tables,
+      coroutine=_run_in_thread(list_tables),
       name='list_tables',
-      description='List all tables in a specific schema. Requires catalog and schema names.',
+      description='List tables in a schema.',
       args_schema=TableInput,
+      handle_validation_error=_invalid_arguments,
+    ),
+    StructuredTool.from_function(
+      coroutine=list_tables_bulk,
+      name='list_tables_bulk',
+      description='Preferred: list tables across several schemas at once.',
+      args_schema=BulkTableInput,
+      handle_validation_error=_invalid_arguments,
     ),
     StructuredTool.from_function(
       func=list_volumes,
+      coroutine=_run_in_thread(list_volumes),
       name='list_volumes',
-      description='List all volumes in a specific schema. Requires catalog and schema names.',
+      description='List volumes in a schema.',
       args_schema=VolumeInput,
+      handle_validation_error=_invalid_arguments,
     ),
   ]
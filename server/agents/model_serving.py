@@ -1,18 +1,63 @@
 """Calls a model serving endpoint."""
 
+import functools
+import json
 import logging
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
 
 import mlflow
-from dotenv import load_dotenv
 from openai import OpenAI
 from openai.types.chat import ChatCompletionMessageParam
 
-load_dotenv(dotenv_path='.env.local')
-
 logger = logging.getLogger(__name__)
 
+# Identical requests are answered from an in-process cache unless CACHE_ENABLED=false.
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+
+# Fallback credentials for local development, read once at import. Call reload_auth() after
+# changing them at runtime.
+_HOST: Optional[str] = os.getenv('DATABRICKS_HOST')
+_TOKEN: Optional[str] = os.getenv('DATABRICKS_TOKEN')
+
+
+@functools.lru_cache(maxsize=1)
+def _get_workspace_client():
+  """Get the WorkspaceClient shared by all serving requests."""
+  from databricks.sdk import WorkspaceClient
+
+  return WorkspaceClient()
+
+
+@functools.lru_cache(maxsize=4)
+def _get_base_url(databricks_host: str) -> str:
+  """Build the serving-endpoints base URL for a Databricks host."""
+  # Remove https:// prefix if present since we're adding it
+  if databricks_host.startswith('https://'):
+    databricks_host = databricks_host[8:]
+  return f'https://{databricks_host}/serving-endpoints'
+
+
+@functools.lru_cache(maxsize=4)
+def _get_openai_client(base_url: str) -> OpenAI:
+  """Get the shared OpenAI client for a base URL, so its connection pool is reused."""
+  return OpenAI(api_key='', base_url=base_url)
+
+
+def _with_api_key(client: OpenAI, api_key: str) -> OpenAI:
+  """Point a shared client at the current token, which rotates under OAuth."""
+  client.api_key = api_key
+  return client
+
+
+def reload_auth() -> None:
+  """Re-read fallback credentials from the environment and drop the cached clients."""
+  global _HOST, _TOKEN
+  _HOST = os.getenv('DATABRICKS_HOST')
+  _TOKEN = os.getenv('DATABRICKS_TOKEN')
+  _get_workspace_client.cache_clear()
+  _get_openai_client.cache_clear()
+
 
 # Initialize the OpenAI client lazily to handle deployment environments
 def get_client():
@@ -22,11 +67,9 @@ def get_client():
   The OpenAI client doesn't directly support OAuth, so we use the
   Databricks SDK to get the host and create a proper client.
   """
-  from databricks.sdk import WorkspaceClient
-
   # Try to get a workspace client (handles auth automatically)
   try:
-    w = WorkspaceClient()
+    w = _get_workspace_client()
     # Get the host from the workspace client config
     databricks_host = w.config.host
 
@@ -40,50 +83,21 @@ def get_client():
       auth = w.config.authenticate()
       databricks_token = auth.get('access_token', 'no-token-required')
 
-    # Remove https:// prefix if present since we're adding it
-    if databricks_host.startswith('https://'):
-      databricks_host = databricks_host[8:]
-
-    return OpenAI(
-      api_key=databricks_token,
-      base_url=f'https://{databricks_host}/serving-endpoints',
-    )
+    return _with_api_key(_get_openai_client(_get_base_url(databricks_host)), databricks_token)
   except Exception:
     # Fallback to environment variables for local development
-    databricks_token = os.getenv('DATABRICKS_TOKEN')
-    databricks_host = os.getenv('DATABRICKS_HOST')
-
-    if not databricks_token:
+    if not _TOKEN:
       raise ValueError('Unable to authenticate with Databricks')
-    if not databricks_host:
+    if not _HOST:
       raise ValueError('Unable to determine Databricks host')
 
-    # Remove https:// prefix if present since we're adding it
-    if databricks_host.startswith('https://'):
-      databricks_host = databricks_host[8:]
-
-    return OpenAI(
-      api_key=databricks_token,
-      base_url=f'https://{databricks_host}/serving-endpoints',
-    )
+    return _with_api_key(_get_openai_client(_get_base_url(_HOST)), _TOKEN)
 
 
-@mlflow.trace(span_type='LLM')
-def model_serving_endpoint(
+def _create_completion(
   endpoint_name: str, messages: List[ChatCompletionMessageParam]
 ) -> Dict[str, Any]:
-  """Calls a model serving endpoint using OpenAI client."""
-  # Create request preview
-  user_messages = [msg for msg in messages if hasattr(msg, 'get') and msg.get('role') == 'user']
-  if user_messages:
-    last_content = user_messages[-1].get('content', '')
-    if isinstance(last_content, str):
-      request_preview = last_content
-    else:
-      request_preview = str(last_content) if last_content else 'No user message'
-  else:
-    request_preview = 'No user message'
-
+  """Runs a chat completion and converts it to a plain dict."""
   # Use OpenAI chat completions API with the specified endpoint
   client = get_client()
   response = client.chat.completions.create(
@@ -91,7 +105,7 @@ def model_serving_endpoint(
   )
 
   # Convert OpenAI response to the expected format
-  formatted_response = {
+  return {
     'choices': [
       {
         'message': {
@@ -113,10 +127,37 @@ def model_serving_endpoint(
     'created': response.created,
   }
 
+
+@functools.lru_cache(maxsize=256)
+def _cached_completion(endpoint_name: str, messages_json: str) -> Dict[str, Any]:
+  """Runs a chat completion, memoized on the endpoint and serialized messages."""
+  return _create_completion(endpoint_name, json.loads(messages_json))
+
+
+@mlflow.trace(span_type='LLM')
+def model_serving_endpoint(
+  endpoint_name: str, messages: List[ChatCompletionMessageParam]
+) -> Dict[str, Any]:
+  """Calls a model serving endpoint using OpenAI client."""
+  # Create request preview
+  # Messages are validated as dicts by the API request model.
+  last_content = next(
+    (msg.get('content', '') for msg in reversed(messages) if msg.get('role') == 'user'), None
+  )
+  if isinstance(last_content, str):
+    request_preview = last_content
+  else:
+    request_preview = str(last_content) if last_content else 'No user message'
+
+  if CACHE_ENABLED:
+    formatted_response = _cached_completion(endpoint_name, json.dumps(messages, sort_keys=True))
+  else:
+    formatted_response = _create_completion(endpoint_name, messages)
+
   # Create response preview
   try:
-    response_preview = response.choices[0].message.content or ''
-  except (AttributeError, IndexError):
+    response_preview = formatted_response['choices'][0]['message']['content'] or ''
+  except (KeyError, IndexError):
     response_preview = str(formatted_response)
 
   # Update current trace with better previews
@@ -126,3 +167,17 @@ def model_serving_endpoint(
     logger.warning(f'Could not update trace previews: {e}')
 
   return formatted_response
+
+
+@mlflow.trace(span_type='LLM')
+def model_serving_endpoint_stream(
+  endpoint_name: str, messages: List[ChatCompletionMessageParam]
+) -> Iterator[str]:
+  """Streams a model serving endpoint's response as text deltas."""
+  client = get_client()
+  stream = client.chat.completions.create(
+    model=endpoint_name, messages=messages, max_tokens=1000, temperature=0.1, stream=True
+  )
+  for chunk in stream:
+    if chunk.choices and chunk.choices[0].delta.content:
+      yield chunk.choices[0].delta.content
@@ -1,8 +1,11 @@
 """FastAPI app for the Databricks Apps + Agents demo."""
 
 import argparse
+import asyncio
+import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any, Optional, Union
 
@@ -11,22 +14,30 @@ import mlflow
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from mlflow import MlflowClient
 from pydantic import BaseModel
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 
-from .agents.databricks_assistant import databricks_agent
-from .agents.model_serving import model_serving_endpoint
-from .tracing import (
+# Load .env.local once, before the agent modules below read their configuration.
+load_dotenv(dotenv_path='.env.local')
+
+from .agents.databricks_assistant import (  # noqa: E402
+  databricks_agent,
+  databricks_agent_stream,
+)
+from .agents.model_serving import (  # noqa: E402
+  model_serving_endpoint,
+  model_serving_endpoint_stream,
+)
+from .tracing import (  # noqa: E402
   get_mlflow_experiment_id,
-  setup_mlflow_tracing,
+  start_mlflow_tracing_setup,
+  wait_for_mlflow_tracing_setup,
 )
 
-load_dotenv(dotenv_path='.env.local')
-
 # Configure logging for Databricks Apps monitoring
 # Logs written to stdout/stderr will be available in Databricks Apps UI and /logz endpoint
 logging.basicConfig(
@@ -39,7 +50,44 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Shared client for proxying to the Vite dev server, so connections are kept alive.
+PROXY_CLIENT = httpx.AsyncClient(
+  timeout=30, limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+)
+
+
+# Feedback is logged to MLflow by a single background worker, so the UI acknowledgement does
+# not wait on the MLflow write. The queue is bounded to avoid unbounded task growth.
+FEEDBACK_QUEUE_SIZE = 1000
+FEEDBACK_QUEUE: asyncio.Queue = asyncio.Queue(maxsize=FEEDBACK_QUEUE_SIZE)
+
+# On shutdown, queued feedback gets this long to be logged before the rest is dropped.
+FEEDBACK_DRAIN_TIMEOUT_SECONDS = 10
+
+# Traced requests wait up to this long for the background tracing setup, so their traces (and
+# the trace ids returned to the UI) land in the configured experiment.
+TRACING_SETUP_WAIT_SECONDS = 10
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  """Set up tracing and the feedback worker; drain it and close shared clients on shutdown."""
+  # Tracing setup makes backend calls, so it runs alongside startup instead of blocking it.
+  start_mlflow_tracing_setup()
+  feedback_worker = asyncio.create_task(_feedback_worker())
+  yield
+  try:
+    await asyncio.wait_for(FEEDBACK_QUEUE.join(), timeout=FEEDBACK_DRAIN_TIMEOUT_SECONDS)
+  except asyncio.TimeoutError:
+    logger.warning(
+      f'Dropping {FEEDBACK_QUEUE.qsize()} queued feedback items not logged within '
+      f'{FEEDBACK_DRAIN_TIMEOUT_SECONDS}s of shutdown'
+    )
+  feedback_worker.cancel()
+  await PROXY_CLIENT.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend to access backend APIs
 app.add_middleware(
@@ -99,9 +147,6 @@ async def experiment():
   )
 
 
-setup_mlflow_tracing()
-
-
 @app.get(f'{API_PREFIX}/health')
 async def health_check():
   """Health check endpoint for monitoring app status."""
@@ -145,7 +190,17 @@ class QueryAgentResponse(BaseModel):
   trace_id: Optional[str]
 
 
-client = MlflowClient()
+# Tracing setup no longer runs at import, so point the client at Databricks explicitly rather
+# than at the default local store.
+client = MlflowClient(tracking_uri='databricks')
+
+
+async def _wait_for_tracing_setup() -> None:
+  """Hold a traced request until tracing setup has finished."""
+  if wait_for_mlflow_tracing_setup(0):
+    return
+  if not await asyncio.to_thread(wait_for_mlflow_tracing_setup, TRACING_SETUP_WAIT_SECONDS):
+    logger.warning('MLflow tracing setup is still running; this trace may not reach the experiment')
 
 
 @app.post(f'{API_PREFIX}/agent')
@@ -157,9 +212,10 @@ async def agent(options: AgentRequestOptions) -> QueryAgentResponse:
     user_message = options.inputs['messages'][-1].get('content', '')[:100]  # First 100 chars
 
   logger.info(f"Agent request received: '{user_message}...'")
+  await _wait_for_tracing_setup()
 
   try:
-    response = databricks_agent(**options.inputs)
+    response = await databricks_agent(**options.inputs)
     trace_id = mlflow.get_last_active_trace_id()
 
     # Log successful response
@@ -174,6 +230,29 @@ async def agent(options: AgentRequestOptions) -> QueryAgentResponse:
     raise
 
 
+def _sse(event: str, payload: dict[str, Any]) -> str:
+  """Format a payload as a typed server-sent event frame."""
+  return f'event: {event}\ndata: {json.dumps(payload, default=str)}\n\n'
+
+
+@app.post(f'{API_PREFIX}/agent/stream')
+async def agent_stream(options: AgentRequestOptions):
+  """Streaming agent API.
+
+  Emits `tool_start`, `tool_end`, and `token` events as the agent works, then a final
+  `done` event carrying the trace id.
+  """
+  logger.info('Streaming agent request received')
+  await _wait_for_tracing_setup()
+
+  async def generate():
+    async for event, payload in databricks_agent_stream(**options.inputs):
+      yield _sse(event, payload)
+    yield _sse('done', {'trace_id': mlflow.get_last_active_trace_id()})
+
+  return StreamingResponse(generate(), media_type='text/event-stream')
+
+
 # Log feedback with traceId, assessmentName, and assessmentValue
 
 
@@ -186,6 +265,34 @@ class LogAssessmentRequestOptions(BaseModel):
   assessment_value: Union[str, int, float, bool]
 
 
+def _log_feedback_to_mlflow(options: LogAssessmentRequestOptions) -> None:
+  """Log an assessment to MLflow."""
+  mlflow.log_feedback(
+    trace_id=options.trace_id,
+    name=options.assessment_name,
+    value=options.assessment_value,
+    source=mlflow.entities.AssessmentSource(
+      source_type=mlflow.entities.AssessmentSourceType.LLM_JUDGE,
+      source_id='user_feedback',
+    ),
+  )
+  logger.info(f'Feedback logged to MLflow successfully for trace {options.trace_id}')
+
+
+async def _feedback_worker() -> None:
+  """Log queued feedback to MLflow, one assessment at a time."""
+  # Feedback logged before tracing setup finishes would go to the default tracking URI.
+  await _wait_for_tracing_setup()
+  while True:
+    options = await FEEDBACK_QUEUE.get()
+    try:
+      await asyncio.to_thread(_log_feedback_to_mlflow, options)
+    except Exception as e:
+      logger.error(f'Failed to log feedback: {str(e)}')
+    finally:
+      FEEDBACK_QUEUE.task_done()
+
+
 @app.post(f'{API_PREFIX}/log_assessment')
 async def log_feedback(options: LogAssessmentRequestOptions):
   """Log assessment for the agent API."""
@@ -195,21 +302,14 @@ async def log_feedback(options: LogAssessmentRequestOptions):
   )
 
   try:
-    # Log the assessment
-    mlflow.log_feedback(
-      trace_id=options.trace_id,
-      name=options.assessment_name,
-      value=options.assessment_value,
-      source=mlflow.entities.AssessmentSource(
-        source_type=mlflow.entities.AssessmentSourceType.LLM_JUDGE,
-        source_id='user_feedback',
-      ),
-    )
-    logger.info(f'Feedback logged to MLflow successfully for trace {options.trace_id}')
+    FEEDBACK_QUEUE.put_nowait(options)
+  except asyncio.QueueFull:
+    # Apply backpressure rather than dropping feedback when the worker falls behind.
+    logger.warning('Feedback queue full, logging feedback inline')
+    await _wait_for_tracing_setup()
+    await asyncio.to_thread(_log_feedback_to_mlflow, options)
     return {'status': 'success'}
-  except Exception as e:
-    logger.error(f'Failed to log feedback: {str(e)}')
-    raise
+  return {'status': 'accepted'}
 
 
 class EndpointRequestOptions(BaseModel):
@@ -223,9 +323,28 @@ class EndpointRequestOptions(BaseModel):
 @app.post(f'{API_PREFIX}/invoke_endpoint')
 async def invoke_endpoint(options: EndpointRequestOptions):
   """Agent API."""
+  await _wait_for_tracing_setup()
   return model_serving_endpoint(options.endpoint_name, options.messages)
 
 
+@app.post(f'{API_PREFIX}/invoke_endpoint/stream')
+async def invoke_endpoint_stream(options: EndpointRequestOptions):
+  """Streaming model serving API using server-sent events."""
+  await _wait_for_tracing_setup()
+
+  def generate():
+    # The response has already started by the time the endpoint fails, so report it in-band.
+    try:
+      for delta in model_serving_endpoint_stream(options.endpoint_name, options.messages):
+        yield _sse('token', {'delta': delta})
+    except Exception as e:
+      logger.error(f'Streaming endpoint request failed: {str(e)}')
+      yield _sse('error', {'message': f'I encountered an error: {str(e)}'})
+    yield _sse('done', {'trace_id': mlflow.get_last_active_trace_id()})
+
+  return StreamingResponse(generate(), media_type='text/event-stream')
+
+
 if not IS_DEV:
   # Production: Serve the built React files
   build_path = Path('.') / 'client/build'
@@ -242,27 +361,26 @@ if IS_DEV:
     """Proxy all non-API requests to the Vite dev server."""
     dev_server_url = f'http://localhost:3000/{full_path}'
 
-    async with httpx.AsyncClient() as client:
-      try:
-        # Forward request to Vite dev server
-        response = await client.request(
-          method=request.method,
-          url=dev_server_url,
-          headers=request.headers.raw,
-          content=await request.body(),
-        )
-
-        # Return the actual response from Vite dev server
-        return Response(
-          content=response.content,
-          status_code=response.status_code,
-          headers=dict(response.headers),
-        )
-      except httpx.RequestError:
-        return Response(
-          content='Vite dev server not running.',
-          status_code=502,
-        )
+    try:
+      # Forward request to Vite dev server
+      response = await PROXY_CLIENT.request(
+        method=request.method,
+        url=dev_server_url,
+        headers=request.headers.raw,
+        content=await request.body(),
+      )
+
+      # Return the actual response from Vite dev server
+      return Response(
+        content=response.content,
+        status_code=response.status_code,
+        headers=dict(response.headers),
+      )
+    except httpx.RequestError:
+      return Response(
+        content='Vite dev server not running.',
+        status_code=502,
+      )
 
 
 if __name__ == '__main__':
@@ -1,49 +1,139 @@
 """MLFlow tracing utils."""
 
+import logging
 import os
-from typing import Optional
+import threading
 
-import mlflow
-from mlflow import tracing
+logger = logging.getLogger(__name__)
 
-# Set the mlflow tracking URI to databricks.
-# NOTE: You can also use the environment variable MLFLOW_TRACKING_URI to set the tracking URI.
-mlflow.set_tracking_uri('databricks')
-
-MLFLOW_EXPERIMENT_ID = os.environ.get('MLFLOW_EXPERIMENT_ID', None)
-mlflow.set_experiment(experiment_id=MLFLOW_EXPERIMENT_ID)
-tracing.set_destination(tracing.destination.Databricks(experiment_id=MLFLOW_EXPERIMENT_ID))
+MLFLOW_EXPERIMENT_ID = os.getenv('MLFLOW_EXPERIMENT_ID')
 
 IS_DESTINATION_ONLINE = True
 
+# MLflow is imported on first setup, so importing this module for the constants stays cheap.
+_mlflow = None
+
+# Trace destination set by setup_mlflow_tracing(), reported by get_tracing_config().
+_DESTINATION = None
+
+# Set once setup_mlflow_tracing() has run, so repeated calls are a cheap no-op. Setup may run on
+# a background thread, so it is serialized by _SETUP_LOCK.
+_INITIALIZED = False
+_SETUP_LOCK = threading.Lock()
+
+# Set when a setup attempt has finished, so traced requests can wait for it.
+_SETUP_DONE = threading.Event()
+
+
+def _get_mlflow():
+  """Import mlflow on first use."""
+  global _mlflow
+  if _mlflow is None:
+    import mlflow
+
+    _mlflow = mlflow
+  return _mlflow
+
 
 def setup_mlflow_tracing():
-  """Sets up MLflow tracing."""
+  """Sets up MLflow tracing.
+
+  Only the first call configures MLflow; later calls return immediately. Tracing is disabled,
+  with a warning, when MLFLOW_EXPERIMENT_ID is not set.
+  """
+  _set_mlflow_env_defaults()
+  with _SETUP_LOCK:
+    try:
+      _setup_mlflow_tracing()
+    finally:
+      _SETUP_DONE.set()
+
+
+def start_mlflow_tracing_setup() -> threading.Thread:
+  """Runs setup_mlflow_tracing() on a daemon thread so app startup doesn't wait on it.
+
+  MLflow's environment defaults are applied before the thread starts, so they are in place
+  before any request can create MLflow's trace exporter or HTTP session.
+  """
+  _set_mlflow_env_defaults()
+  thread = threading.Thread(target=setup_mlflow_tracing, name='mlflow-tracing-setup', daemon=True)
+  thread.start()
+  return thread
+
+
+def wait_for_mlflow_tracing_setup(timeout: float) -> bool:
+  """Waits up to timeout seconds for tracing setup to finish, and returns whether it has."""
+  return _SETUP_DONE.wait(timeout)
+
+
+def _set_mlflow_env_defaults() -> None:
+  """Defaults the MLflow settings that are read when its HTTP session is created."""
+  # Traces sent to Databricks are already exported from a bounded background pool outside
+  # notebooks (MLFLOW_ENABLE_ASYNC_TRACE_LOGGING and the MLFLOW_ASYNC_TRACE_LOGGING_* limits).
+  # The exporter drops traces when its queue is full, so those are left at MLflow's defaults.
+
+  # MLflow keeps one pooled HTTP session per host; size the pool for concurrent trace exports
+  # and feedback logging so requests reuse connections instead of reconnecting.
+  os.environ.setdefault('MLFLOW_HTTP_POOL_CONNECTIONS', '32')
+  os.environ.setdefault('MLFLOW_HTTP_POOL_MAXSIZE', '32')
+
+
+def _setup_mlflow_tracing():
+  """Configures MLflow tracing; callers hold _SETUP_LOCK."""
+  global _DESTINATION, _INITIALIZED
+  if _INITIALIZED:
+    return
+
+  if not MLFLOW_EXPERIMENT_ID:
+    # Otherwise traces would still be written to the local tracking store, with ids the UI can't
+    # open.
+    logger.warning('MLFLOW_EXPERIMENT_ID is not set; MLflow tracing is disabled.')
+    _get_mlflow().tracing.disable()
+    _INITIALIZED = True
+    return
+
+  mlflow = _get_mlflow()
+  from mlflow import tracing
+
   # Set the mlflow tracking URI to databricks.
+  # NOTE: You can also use the environment variable MLFLOW_TRACKING_URI to set the tracking URI.
   mlflow.set_tracking_uri('databricks')
 
-  MLFLOW_EXPERIMENT_ID = os.environ.get('MLFLOW_EXPERIMENT_ID', None)
-  mlflow.set_experiment(experiment_id=MLFLOW_EXPERIMENT_ID)
-  
+  # The destination carries the experiment id, so traces go there without set_experiment()
+  # looking the experiment up over REST. MLflow reads MLFLOW_EXPERIMENT_ID from the environment
+  # for anything else that needs it.
+  # This also builds the span processor, which resolves the environment/git metadata attached
+  # to every trace once for the life of the process, so the first request doesn't pay for it.
+  _DESTINATION = tracing.destination.Databricks(experiment_id=MLFLOW_EXPERIMENT_ID)
+  tracing.set_destination(_DESTINATION)
+
   # Enable LangChain autologging
   # This automatically logs:
   # - LLM calls with prompts and completions
   # - Tool invocations with inputs and outputs
   # - Agent executor runs with full conversation history
   # - Retriever queries and results (if using RAG)
+  # Only traces are logged; no models, signatures or input examples are inferred per call.
+  # Requests are independent, so traces never attach to a user-created run, and MLflow's
+  # per-call autologging messages are silenced.
   mlflow.langchain.autolog(
-    log_input_examples=True,
-    log_model_signatures=True,
-    log_models=False,  # We don't need to log models, just traces
-    log_datasets=False,
-    log_inputs_outputs=True,
     disable=False,
-    exclusive=False,
+    exclusive=True,
     disable_for_unsupported_versions=False,
-    silent=False
+    silent=True,
   )
 
+  _INITIALIZED = True
+
 
-def get_mlflow_experiment_id() -> Optional[str]:
+def get_mlflow_experiment_id() -> str | None:
   """Gets the current mlflow experiment id."""
   return MLFLOW_EXPERIMENT_ID
+
+
+def get_tracing_config() -> tuple[str | None, object]:
+  """Gets the `(experiment_id, destination)` tracing is configured with.
+
+  The destination is None until setup_mlflow_tracing() has set it.
+  """
+  return MLFLOW_EXPERIMENT_ID, _DESTINATION
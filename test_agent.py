@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 """Test script for the Databricks agent."""
 
+import asyncio
 import json
 import sys
 from pathlib import Path
 
+from dotenv import load_dotenv
+
 # Add the project root to the Python path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
+load_dotenv(dotenv_path='.env.local')
+
 # Import after path setup (required for this script structure)
 from server.agents.databricks_assistant import databricks_agent  # noqa: E402
 from server.tracing import setup_mlflow_tracing  # noqa: E402
@@ -34,7 +39,7 @@ def main():
   print('=' * 30)
 
   try:
-    response = databricks_agent(test_messages)
+    response = asyncio.run(databricks_agent(test_messages))
     print(json.dumps(response, indent=2))
 
     # Also show just the content for easier reading